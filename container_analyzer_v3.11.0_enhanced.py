@@ -18,11 +18,9 @@ Date: 2025-11-18
 import pandas as pd
 import numpy as np
 from scipy.optimize import curve_fit
-from scipy.signal import savgol_filter
-from scipy.interpolate import CubicSpline
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from scipy.signal import savgol_coeffs
+from scipy.ndimage import convolve1d
+import io
 import os
 from datetime import datetime
 import sys
@@ -83,7 +81,9 @@ DEFAULT_PARAMS = {
     'hermite_tension': 0.6,
     'merge_threshold': 0.05,
     'angular_resolution': 48,
-    'maxfev': 4000
+    'maxfev': 4000,
+    'smoothing_noise_ratio': 1e-4,
+    'plot_dpi': 150
 }
 
 GEOMETRIC_CONSTRAINTS = {
@@ -97,6 +97,9 @@ GEOMETRIC_CONSTRAINTS = {
 class AnalysisJob:
     """Track analysis job execution details for reporting."""
     
+    __slots__ = ('input_file', 'start_time', 'end_time', 'duration', 'steps_completed',
+                 'errors', 'warnings', 'output_files', 'statistics')
+    
     def __init__(self, input_file: str):
         self.input_file = input_file
         self.start_time = time.time()
@@ -219,10 +222,10 @@ def load_data_csv(csv_path, job: AnalysisJob = None, verbose=True):
         if df_clean['Height_mm'].min() < 0 or df_clean['Volume_ml'].min() < 0:
             raise ValueError("Negative heights or volumes detected")
         
-        if verbose:
-            logger.info(f"✅ Data loaded: {len(df_clean)} points")
-            logger.info(f"   Height: {df_clean['Height_mm'].min():.1f} - {df_clean['Height_mm'].max():.1f} mm")
-            logger.info(f"   Volume: {df_clean['Volume_ml'].min():.3f} - {df_clean['Volume_ml'].max():.3f} ml")
+        if verbose and logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Data loaded: %s points", len(df_clean))
+            logger.info("   Height: %.1f - %.1f mm", df_clean['Height_mm'].min(), df_clean['Height_mm'].max())
+            logger.info("   Volume: %.3f - %.3f ml", df_clean['Volume_ml'].min(), df_clean['Volume_ml'].max())
         
         if job:
             job.complete_step('Data Loading', time.time() - step_start)
@@ -235,7 +238,7 @@ def load_data_csv(csv_path, job: AnalysisJob = None, verbose=True):
     except Exception as e:
         if job:
             job.add_error(f"Data loading failed: {str(e)}")
-        logger.error(f"Error loading CSV '{csv_path}': {str(e)}")
+        logger.error("Error loading CSV '%s': %s", csv_path, e)
         raise RuntimeError(f"Error loading CSV '{csv_path}': {str(e)}")
 
 def compute_areas(df, job: AnalysisJob = None, min_dv=None, verbose=True):
@@ -265,9 +268,9 @@ def compute_areas(df, job: AnalysisJob = None, min_dv=None, verbose=True):
     # Remove first row (no area)
     df_areas = df.iloc[1:].reset_index(drop=True)
     
-    if verbose:
-        logger.info(f"📐 Areas computed: {len(df_areas)} points")
-        logger.info(f"   Mean: {df_areas['Area'].mean():.1f} ± {df_areas['Area'].std():.1f} mm²")
+    if verbose and logger.isEnabledFor(logging.INFO):
+        logger.info("📐 Areas computed: %s points", len(df_areas))
+        logger.info("   Mean: %.1f ± %.1f mm²", df_areas['Area'].mean(), df_areas['Area'].std())
     
     if job:
         job.complete_step('Area Computation', time.time() - step_start)
@@ -278,13 +281,34 @@ def compute_areas(df, job: AnalysisJob = None, min_dv=None, verbose=True):
     
     return df_areas
 
+# Savitzky-Golay coefficients keyed by (window, polyorder)
+_SG_CACHE = {}
+
+def _sg(x, window, polyorder=2):
+    """Savitzky-Golay smoothing with cached coefficients (equivalent to savgol_filter mode='interp')."""
+    x = np.asarray(x, dtype=float)
+    if window > len(x):
+        raise ValueError(f"window ({window}) must not exceed input length ({len(x)})")
+    
+    coeffs = _SG_CACHE.get((window, polyorder))
+    if coeffs is None:
+        coeffs = _SG_CACHE.setdefault((window, polyorder), savgol_coeffs(window, polyorder))
+    smooth = convolve1d(x, coeffs, mode='constant')
+    
+    # Edges: polynomial fit over the first/last window, as savgol_filter does
+    half = window // 2
+    z = np.arange(window, dtype=float)
+    smooth[:half] = np.polyval(np.polyfit(z, x[:window], polyorder), z[:half])
+    smooth[len(x) - half:] = np.polyval(np.polyfit(z, x[-window:], polyorder), z[window - half:])
+    return smooth
+
 def find_optimal_transitions(area, min_points=12, percentile=80, variance_threshold=0.15, verbose=False):
     """Detect geometric segment transitions using adaptive smoothing."""
     n = len(area)
     
     if n < 2 * min_points:
         if verbose:
-            logger.warning(f"⚠️  Too few points for segmentation ({n} < {2*min_points})")
+            logger.warning("⚠️  Too few points for segmentation (%s < %s)", n, 2*min_points)
         return [0, n - 1]
     
     # Adaptive smoothing
@@ -292,44 +316,57 @@ def find_optimal_transitions(area, min_points=12, percentile=80, variance_thresh
     if window % 2 == 0:
         window += 1
     
-    try:
-        area_smooth = savgol_filter(area, window_length=window, polyorder=min(2, window//2))
-    except:
-        area_smooth = pd.Series(area).rolling(window, center=True, min_periods=1).median().bfill().ffill().values
+    # Skip smoothing for effectively noise-free data (second-difference noise estimate)
+    noise_std = np.std(np.diff(area, n=2)) / np.sqrt(6.0)
+    if noise_std / (np.ptp(area) + 1e-12) < DEFAULT_PARAMS['smoothing_noise_ratio']:
+        area_smooth = np.asarray(area, dtype=float)
+    else:
+        try:
+            area_smooth = _sg(area, window, polyorder=min(2, window//2))
+        except (ValueError, np.linalg.LinAlgError) as e:
+            logger.debug("Savitzky-Golay smoothing failed, using rolling median: %s", e)
+            area_smooth = pd.Series(area).rolling(window, center=True, min_periods=1).median().bfill().ffill().values
     
     # Detect change points
-    diff = np.abs(np.diff(area_smooth))
+    diff = np.diff(area_smooth)
+    np.abs(diff, out=diff)
     threshold = np.percentile(diff, percentile)
     candidates = np.where(diff > threshold)[0] + 1
     
     if verbose:
-        logger.info(f"🔍 Transition detection: {len(candidates)} candidates")
+        logger.info("🔍 Transition detection: %s candidates", len(candidates))
     
-    # Filter by segment length
+    # Filter by segment length: jump straight to the first candidate
+    # at least min_points past the last accepted transition
     transitions = [0]
-    for cand in candidates:
-        if cand - transitions[-1] >= min_points:
-            transitions.append(cand)
+    pos = np.searchsorted(candidates, min_points)
+    while pos < len(candidates):
+        transitions.append(candidates[pos])
+        pos = np.searchsorted(candidates, candidates[pos] + min_points)
     
     # Ensure endpoint
     if transitions[-1] != n - 1:
         transitions.append(n - 1)
     
-    # Variance validation
+    # Variance validation (prefix sums give each segment's mean/std in O(1))
+    csum = np.concatenate(([0.0], np.cumsum(area)))
+    csum_sq = np.concatenate(([0.0], np.cumsum(np.square(area))))
     validated = [0]
     for i in range(len(transitions) - 1):
         seg_start, seg_end = transitions[i], transitions[i + 1]
         if seg_end - seg_start + 1 >= min_points:
-            seg_var = np.std(area[seg_start:seg_end]) / (np.mean(area[seg_start:seg_end]) + 1e-8)
+            seg_len = seg_end - seg_start
+            seg_mean = (csum[seg_end] - csum[seg_start]) / seg_len
+            seg_sq = (csum_sq[seg_end] - csum_sq[seg_start]) / seg_len
+            seg_var = np.sqrt(max(seg_sq - seg_mean**2, 0.0)) / (seg_mean + 1e-8)
             if seg_var > variance_threshold or i in [0, len(transitions) - 2]:
                 validated.append(seg_end)
     
     if not validated or validated[-1] != n - 1:
         validated[-1] = n - 1
     
-    validated = sorted(list(set(validated)))
     if verbose:
-        logger.info(f"   Validated segments: {len(validated)//2}")
+        logger.info("   Validated segments: %s", len(validated)//2)
     
     return validated
 
@@ -344,6 +381,8 @@ def segment_and_fit_optimized(df_areas, job: AnalysisJob = None, verbose=True):
             job.add_warning(warning_msg)
     
     area = df_areas['Area'].values
+    heights = df_areas['Height_mm'].values
+    volumes = df_areas['Volume_mm3'].values
     transitions = find_optimal_transitions(area)
     segments = []
     fit_errors = []
@@ -355,23 +394,25 @@ def segment_and_fit_optimized(df_areas, job: AnalysisJob = None, verbose=True):
         if end - start + 1 < DEFAULT_PARAMS['min_points']:
             continue
         
-        x = df_areas['Height_mm'].iloc[start:end + 1].values
-        y = df_areas['Volume_mm3'].iloc[start:end + 1].values
+        x = heights[start:end + 1]
+        y = volumes[start:end + 1]
         height_span = float(x[-1] - x[0])
         mean_area = float(np.median(area[start:end + 1]))
         guess_r = float(np.sqrt(mean_area / np.pi))
         
-        # Try cylinder fit first
+        # Try cylinder fit first (V = pi*r^2*h is linear in r^2: closed-form least squares)
         try:
             bounds_lower = GEOMETRIC_CONSTRAINTS['fit_bounds_lower'] * guess_r
             bounds_upper = GEOMETRIC_CONSTRAINTS['fit_bounds_upper'] * guess_r
-            popt_cyl, _ = curve_fit(volume_cylinder, x - x[0], y - y[0], 
-                                  p0=[guess_r], bounds=([bounds_lower], [bounds_upper]), 
-                                  maxfev=DEFAULT_PARAMS['maxfev'])
+            h = x - x[0]
+            r_sq = np.dot(h, y - y[0]) / (np.pi * np.dot(h, h))
+            if not np.isfinite(r_sq):
+                raise ValueError("degenerate height span")
+            popt_cyl = np.array([np.clip(np.sqrt(max(r_sq, 0.0)), bounds_lower, bounds_upper)])
             cyl_error = np.mean(np.abs(volume_cylinder(x - x[0], *popt_cyl) + y[0] - y))
             cyl_error_pct = (cyl_error / y[-1]) * 100
         except Exception as e:
-            logger.debug(f"Cylinder fit failed for segment {i}: {e}")
+            logger.debug("Cylinder fit failed for segment %s: %s", i, e)
             popt_cyl = None
             cyl_error = np.inf
             cyl_error_pct = np.inf
@@ -397,7 +438,7 @@ def segment_and_fit_optimized(df_areas, job: AnalysisJob = None, verbose=True):
             frust_error = np.mean(np.abs(volume_frustum(x - x[0], *popt_frust) + y[0] - y))
             frust_error_pct = (frust_error / y[-1]) * 100
         except Exception as e:
-            logger.debug(f"Frustum fit failed for segment {i}: {e}")
+            logger.debug("Frustum fit failed for segment %s: %s", i, e)
             popt_frust = None
             frust_error = np.inf
             frust_error_pct = np.inf
@@ -415,9 +456,9 @@ def segment_and_fit_optimized(df_areas, job: AnalysisJob = None, verbose=True):
             fit_errors.append(0.0)
     
     if verbose:
-        logger.info(f"✅ Detected {len(segments)} segments")
+        logger.info("✅ Detected %s segments", len(segments))
         if fit_errors:
-            logger.info(f"   Average fit error: {np.mean(fit_errors):.3f}%")
+            logger.info("   Average fit error: %.3f%%", np.mean(fit_errors))
     
     if job:
         job.complete_step('Segmentation & Fitting', time.time() - step_start)
@@ -428,23 +469,31 @@ def segment_and_fit_optimized(df_areas, job: AnalysisJob = None, verbose=True):
     
     return segments
 
+# Hermite basis arrays keyed by num_points
+_HERMITE_CACHE = {}
+
 def hermite_spline_transition(z1, r1, slope1, z2, r2, slope2, num_points=25, tension=0.6):
     """C¹ continuous Hermite cubic spline transition."""
     dz = z2 - z1
     if dz <= 0:
         return np.linspace(z1, z2, num_points), np.full(num_points, (r1 + r2) / 2)
     
-    t = np.linspace(0, 1, num_points)
+    # Hermite basis functions (cached per resolution)
+    basis = _HERMITE_CACHE.get(num_points)
+    if basis is None:
+        t = np.linspace(0, 1, num_points)
+        t2 = t**2
+        t3 = t**3
+        basis = _HERMITE_CACHE.setdefault(num_points, (
+            t,
+            2*t3 - 3*t2 + 1,
+            -2*t3 + 3*t2,
+            t3 * (t - 1),
+            t2 * (t - 1),
+        ))
+    t, h00, h10, h01, h11 = basis
     z_trans = z1 + t * dz
     
-    # Hermite basis functions
-    t2 = t**2
-    t3 = t**3
-    h00 = 2*t3 - 3*t2 + 1
-    h10 = -2*t3 + 3*t2
-    h01 = t3 * (t - 1)
-    h11 = t2 * (t - 1)
-    
     m0 = slope1 * dz * tension
     m1 = slope2 * dz * tension
     
@@ -465,9 +514,11 @@ def create_enhanced_profile(segments, df_areas, job: AnalysisJob = None, transit
     """Generate smooth 2D profile with Hermite transitions."""
     step_start = time.time()
     
+    heights = df_areas['Height_mm'].values
+    areas = df_areas['Area'].values
+    
     if len(segments) <= 1:
-        heights = df_areas['Height_mm'].values
-        radii = np.sqrt(np.maximum(df_areas['Area'].values / np.pi, 0.01))
+        radii = np.sqrt(np.maximum(areas / np.pi, 0.01))
         return heights, radii
     
     full_z = []
@@ -475,8 +526,8 @@ def create_enhanced_profile(segments, df_areas, job: AnalysisJob = None, transit
     
     for i in range(len(segments)):
         start, end, shape, params = segments[i]
-        h_start = df_areas.iloc[start]['Height_mm']
-        h_end = df_areas.iloc[end]['Height_mm']
+        h_start = heights[start]
+        h_end = heights[end]
         h_span = h_end - h_start
         
         if h_span <= 0:
@@ -496,28 +547,28 @@ def create_enhanced_profile(segments, df_areas, job: AnalysisJob = None, transit
             r_seg = r1 + (r2 - r1) * t
             slope_end = (r2 - r1) / h_span
         else:
-            r_start = np.sqrt(df_areas.iloc[start]['Area'] / np.pi)
-            r_end = np.sqrt(df_areas.iloc[min(end, len(df_areas)-1)]['Area'] / np.pi)
+            r_start = np.sqrt(areas[start] / np.pi)
+            r_end = np.sqrt(areas[min(end, len(areas)-1)] / np.pi)
             r_seg = r_start + (r_end - r_start) * (h_rel / h_span)
             slope_end = (r_end - r_start) / h_span
         
         z_seg = h_start + h_rel
-        full_z.extend(z_seg)
-        full_r.extend(r_seg)
+        full_z.append(z_seg)
+        full_r.append(r_seg)
         
         # Smooth transition to next segment
         if i < len(segments) - 1:
             next_start, next_end, next_shape, next_params = segments[i+1]
-            next_h_start = df_areas.iloc[next_start]['Height_mm']
+            next_h_start = heights[next_start]
             
             if next_shape == 'cylinder' and len(next_params) == 1:
                 next_r_start = float(next_params[0])
                 next_slope = 0.0
             elif next_shape == 'frustum' and len(next_params) >= 3:
                 next_r_start = float(next_params[0])
-                next_slope = (next_params[1] - next_params[0]) / (df_areas.iloc[next_end]['Height_mm'] - df_areas.iloc[next_start]['Height_mm'])
+                next_slope = (next_params[1] - next_params[0]) / (heights[next_end] - heights[next_start])
             else:
-                next_r_start = np.sqrt(df_areas.iloc[next_start]['Area'] / np.pi)
+                next_r_start = np.sqrt(areas[next_start] / np.pi)
                 next_slope = 0.0
             
             buffer = min(3.0, max(1.5, abs(r_seg[-1] - next_r_start) * 1.5))
@@ -529,27 +580,26 @@ def create_enhanced_profile(segments, df_areas, job: AnalysisJob = None, transit
                 tension=hermite_tension
             )
             
-            full_z.extend(z_trans[1:-1])
-            full_r.extend(r_trans[1:-1])
+            full_z.append(z_trans[1:-1])
+            full_r.append(r_trans[1:-1])
     
-    # Clean and return profile
+    # Clean and return profile: sorted by z, first sample kept for duplicate heights
+    full_z = np.concatenate(full_z) if full_z else np.empty(0)
     if len(full_z) > 1:
-        profile_df = pd.DataFrame({'z': full_z, 'r': full_r})
-        profile_df = profile_df.drop_duplicates('z').sort_values('z').reset_index(drop=True)
+        z_final, first = np.unique(full_z, return_index=True)
         
         # Final numerical smoothing
         from scipy.ndimage import gaussian_filter1d
-        r_final = gaussian_filter1d(profile_df['r'].values, sigma=0.8, mode='nearest')
-        profile_df['r'] = r_final
-        profile_df['r'] = np.maximum(profile_df['r'], 0.1)
+        r_final = gaussian_filter1d(np.concatenate(full_r)[first], sigma=0.8, mode='nearest')
+        r_final = np.maximum(r_final, 0.1)
         
         if job:
             job.complete_step('Profile Generation', time.time() - step_start)
-            job.statistics['profile_points'] = len(profile_df)
+            job.statistics['profile_points'] = len(z_final)
         
-        return profile_df['z'].values, profile_df['r'].values
+        return z_final, r_final
     else:
-        return df_areas['Height_mm'].values, np.sqrt(np.maximum(df_areas['Area'].values / np.pi, 0.01))
+        return heights, np.sqrt(np.maximum(areas / np.pi, 0.01))
 
 def calculate_profile_volume(z, r):
     """Compute volume from smooth 2D profile."""
@@ -563,6 +613,19 @@ def calculate_profile_volume(z, r):
     volumes = np.cumsum(dvol)
     return np.concatenate([[0.0], volumes])
 
+def nearest_profile_index(z_profile, heights):
+    """Index of the closest profile point for each height (z_profile ascending, first index on ties)."""
+    z_profile = np.asarray(z_profile)
+    heights = np.asarray(heights)
+    if len(z_profile) < 2:
+        return np.zeros(len(heights), dtype=np.intp)
+    
+    right = np.clip(np.searchsorted(z_profile, heights), 1, len(z_profile) - 1)
+    left = right - 1
+    idx = np.where(np.abs(heights - z_profile[left]) <= np.abs(z_profile[right] - heights), left, right)
+    # Repeated profile heights resolve to their first occurrence, as np.argmin does
+    return np.searchsorted(z_profile, z_profile[idx])
+
 def validate_volume_accuracy(original_volume_ml, calculated_volume_mm3, tolerance=0.01):
     """Validate volume preservation."""
     original_mm3 = original_volume_ml * 1000
@@ -599,43 +662,38 @@ def export_stl_watertight(z_profile, r_profile, filename, job: AnalysisJob = Non
     angles = np.linspace(0, 2 * np.pi, angular_res, endpoint=False)
     n_p = len(z_profile)
     
-    # Vertices
-    verts = np.zeros((angular_res * n_p, 3))
-    for i, angle in enumerate(angles):
-        idx = slice(i * n_p, (i + 1) * n_p)
-        verts[idx, 0] = r_profile * np.cos(angle)
-        verts[idx, 1] = r_profile * np.sin(angle)
-        verts[idx, 2] = z_profile
+    # Vertices: one ring of n_p profile points per angle
+    cos_a = np.cos(angles)
+    sin_a = np.sin(angles)
+    verts = np.empty((angular_res, n_p, 3))
+    verts[:, :, 0] = np.outer(cos_a, r_profile)
+    verts[:, :, 1] = np.outer(sin_a, r_profile)
+    verts[:, :, 2] = z_profile
+    verts = verts.reshape(-1, 3)
     
     # Sidewall faces
-    faces = []
-    for i in range(angular_res):
-        i_next = (i + 1) % angular_res
-        base = i * n_p
-        next_base = i_next * n_p
-        for j in range(n_p - 1):
-            v0, v1 = base + j, base + j + 1
-            v2, v3 = next_base + j, next_base + j + 1
-            faces.extend([[v0, v2, v1], [v1, v2, v3]])
-    
-    faces = np.array(faces, dtype=np.uint32)
+    ring = np.arange(angular_res)
+    ring_next = np.roll(ring, -1)
+    j = np.arange(n_p - 1)
+    v0 = ring[:, None] * n_p + j
+    v2 = ring_next[:, None] * n_p + j
+    v1, v3 = v0 + 1, v2 + 1
+    faces = np.empty((angular_res, n_p - 1, 2, 3), dtype=np.uint32)
+    faces[:, :, 0] = np.stack([v0, v2, v1], axis=-1)
+    faces[:, :, 1] = np.stack([v1, v2, v3], axis=-1)
+    faces = faces.reshape(-1, 3)
     
     # Bottom cap
     bottom_r = r_profile[0]
     if bottom_r > 0.1:
         bottom_base = len(verts)
-        bottom_verts = np.array([
-            [bottom_r * np.cos(angle), bottom_r * np.sin(angle), 0.0]
-            for angle in angles
-        ])
+        bottom_verts = np.column_stack([bottom_r * cos_a, bottom_r * sin_a, np.zeros(angular_res)])
         center_bottom = np.array([0, 0, 0.0])
         verts = np.vstack([verts, bottom_verts, center_bottom])
         
-        bottom_faces = []
-        for k in range(angular_res):
-            k_next = (k + 1) % angular_res
-            bottom_faces.append([bottom_base + k, bottom_base + k_next, len(verts) - 1])
-        faces = np.vstack([faces, np.array(bottom_faces, dtype=np.uint32)])
+        bottom_faces = np.column_stack([bottom_base + ring, bottom_base + ring_next,
+                                        np.full(angular_res, len(verts) - 1)])
+        faces = np.vstack([faces, bottom_faces.astype(np.uint32)])
     
     # Create mesh
     try:
@@ -645,12 +703,12 @@ def export_stl_watertight(z_profile, r_profile, filename, job: AnalysisJob = Non
         mesh_volume_ml = mesh.volume / 1000
         
         if verbose:
-            logger.info(f"📐 STL Export:")
-            logger.info(f"   Filename: {filename}")
-            logger.info(f"   Vertices: {len(verts)}")
-            logger.info(f"   Faces: {len(faces)}")
-            logger.info(f"   Volume: {mesh_volume_ml:.3f} ml")
-            logger.info(f"   Watertight: {mesh.is_watertight}")
+            logger.info("📐 STL Export:")
+            logger.info("   Filename: %s", filename)
+            logger.info("   Vertices: %s", len(verts))
+            logger.info("   Faces: %s", len(faces))
+            logger.info("   Volume: %.3f ml", mesh_volume_ml)
+            logger.info("   Watertight: %s", mesh.is_watertight)
         
         mesh.export(filename)
         
@@ -666,7 +724,7 @@ def export_stl_watertight(z_profile, r_profile, filename, job: AnalysisJob = Non
     
     except Exception as e:
         if verbose:
-            logger.error(f"❌ STL export failed: {e}", exc_info=True)
+            logger.error("❌ STL export failed: %s", e, exc_info=True)
         if job:
             job.add_error(f"STL export failed: {str(e)}")
         return None
@@ -911,16 +969,20 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
     
     segment_data = [['ID', 'Type', 'Height Range (mm)', 'Parameters', 'Volume (ml)', 'Fit Error (%)']]
     
+    # Column arrays fetched once for all table rows
+    heights = df_areas['Height_mm'].values
+    volumes = df_areas['Volume_mm3'].values
+    last_idx = len(df_areas) - 1
+    fit_errors = job.statistics.get('fit_errors', [])
+    
     for i, seg in enumerate(segments):
         start_idx, end_idx, shape, params = seg
         
-        h_start = df_areas.iloc[start_idx]['Height_mm']
-        h_end = df_areas.iloc[min(end_idx, len(df_areas)-1)]['Height_mm']
+        h_start = heights[start_idx]
+        h_end = heights[min(end_idx, last_idx)]
         h_range = f"{h_start:.1f} - {h_end:.1f}"
         
-        vol_start = df_areas['Volume_mm3'].iloc[start_idx]
-        vol_end = df_areas['Volume_mm3'].iloc[min(end_idx, len(df_areas)-1)]
-        seg_vol = (vol_end - vol_start) / 1000
+        seg_vol = (volumes[min(end_idx, last_idx)] - volumes[start_idx]) / 1000
         
         if len(params) == 1:
             params_str = f"r = {params[0]:.2f} mm"
@@ -929,7 +991,7 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
         else:
             params_str = "N/A"
         
-        fit_error = job.statistics['fit_errors'][i] if i < len(job.statistics.get('fit_errors', [])) else 0.0
+        fit_error = fit_errors[i] if i < len(fit_errors) else 0.0
         
         segment_data.append([
             str(i+1), 
@@ -960,22 +1022,13 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
     story.append(Paragraph("📊 Analysis Visualizations", heading1_style))
     story.append(Spacer(1, 0.2*inch))
     
-    # Generate comprehensive plots
-    plot_filename = os.path.join(os.path.dirname(csv_path) or '.', 
-                                 f"temp_plots_{timestamp}.png")
-    plot_path = generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, plot_filename)
+    # Render comprehensive plots in memory; ReportLab reads the image at build time
+    plot_buffer = generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, io.BytesIO())
     
-    if plot_path and os.path.exists(plot_path):
-        try:
-            img = Image(plot_path, width=6.5*inch, height=8*inch)
-            story.append(img)
-        finally:
-            # Clean up temp file
-            try:
-                if os.path.exists(plot_path):
-                    os.remove(plot_path)
-            except:
-                pass
+    if plot_buffer is not None:
+        plot_buffer.seek(0)
+        img = Image(plot_buffer, width=6.5*inch, height=8*inch)
+        story.append(img)
     
     story.append(PageBreak())
     
@@ -989,6 +1042,7 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
     • Savitzky-Golay Window: {DEFAULT_PARAMS['sg_window']}<br/>
     • Percentile Threshold: {DEFAULT_PARAMS['percentile']}<br/>
     • Variance Threshold: {DEFAULT_PARAMS['variance_threshold']}<br/>
+    • Smoothing Noise Gate: {DEFAULT_PARAMS['smoothing_noise_ratio']}<br/>
     <br/>
     <b>Geometric Fitting:</b><br/>
     • Maximum Function Evaluations: {DEFAULT_PARAMS['maxfev']}<br/>
@@ -1023,7 +1077,7 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
     try:
         doc.build(story)
         if verbose:
-            logger.info(f"✅ Enhanced PDF Report generated: {os.path.basename(pdf_filename)}")
+            logger.info("✅ Enhanced PDF Report generated: %s", os.path.basename(pdf_filename))
         
         if job:
             job.complete_step('PDF Report Generation', time.time() - step_start)
@@ -1032,34 +1086,47 @@ def generate_enhanced_pdf_report(df, df_areas, segments, z_profile, r_profile,
         return pdf_filename
     except Exception as e:
         if verbose:
-            logger.error(f"⚠️  PDF generation failed: {e}", exc_info=True)
+            logger.error("⚠️  PDF generation failed: %s", e, exc_info=True)
         if job:
             job.add_error(f"PDF generation failed: {str(e)}")
         return None
 
 def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, save_path):
     """Generate comprehensive 6-panel analysis plots."""
+    # matplotlib is only needed for reports; import it on first use.
+    # Object-oriented Agg canvas: no pyplot global figure registry.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
     try:
-        fig = plt.figure(figsize=(14, 16))
+        fig = Figure(figsize=(14, 16))
+        FigureCanvasAgg(fig)
         fig.patch.set_facecolor('white')
         
+        # Columns and area statistics shared by several panels
+        heights = df_areas['Height_mm'].values
+        measured_volumes = df_areas['Volume_mm3'].values
+        areas = df_areas['Area'].values
+        area_mean = df_areas['Area'].mean()
+        area_std = df_areas['Area'].std()
+        
         # Plot 1: Volume vs Height with fits
-        ax1 = plt.subplot(3, 2, 1)
+        ax1 = fig.add_subplot(3, 2, 1)
         ax1.scatter(df['Height_mm'], df['Volume_mm3'], s=20, alpha=0.7, 
                    color='skyblue', label='Measured Data', zorder=3)
         
         colors_palette = ['#e74c3c', '#3498db', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
         for i, seg in enumerate(segments):
             start, end, shape, params = seg
-            x_seg = df_areas['Height_mm'].iloc[start:end+1].values
+            x_seg = heights[start:end+1]
             
             if shape == 'cylinder' and len(params) == 1:
                 r = float(params[0])
-                y_fit = volume_cylinder(x_seg - x_seg[0], r) + df_areas['Volume_mm3'].iloc[start]
+                y_fit = volume_cylinder(x_seg - x_seg[0], r) + measured_volumes[start]
                 label = f"S{i+1}: Cyl r={r:.1f}mm"
             else:
                 r1, r2, H = float(params[0]), float(params[1]), float(params[2])
-                y_fit = volume_frustum(x_seg - x_seg[0], r1, r2, H) + df_areas['Volume_mm3'].iloc[start]
+                y_fit = volume_frustum(x_seg - x_seg[0], r1, r2, H) + measured_volumes[start]
                 label = f"S{i+1}: Frust {r1:.1f}→{r2:.1f}mm"
             
             ax1.plot(x_seg, y_fit, color=colors_palette[i % len(colors_palette)], 
@@ -1072,9 +1139,9 @@ def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, s
         ax1.grid(True, alpha=0.3)
         
         # Plot 2: Radius profile
-        ax2 = plt.subplot(3, 2, 2)
-        radii = np.sqrt(df_areas['Area'].values / np.pi)
-        ax2.plot(df_areas['Height_mm'], radii, 'b-', linewidth=1.5, alpha=0.6, label='Measured')
+        ax2 = fig.add_subplot(3, 2, 2)
+        radii = np.sqrt(areas / np.pi)
+        ax2.plot(heights, radii, 'b-', linewidth=1.5, alpha=0.6, label='Measured')
         ax2.plot(z_profile, r_profile, 'r-', linewidth=2, label='Smooth Profile', alpha=0.8)
         ax2.set_xlabel('Height (mm)', fontsize=11, fontweight='bold')
         ax2.set_ylabel('Radius (mm)', fontsize=11, fontweight='bold')
@@ -1083,13 +1150,11 @@ def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, s
         ax2.grid(True, alpha=0.3)
         
         # Plot 3: Cross-sectional area
-        ax3 = plt.subplot(3, 2, 3)
-        ax3.plot(df_areas['Height_mm'], df_areas['Area'], 'g-', linewidth=1.5, alpha=0.8)
-        ax3.axhline(df_areas['Area'].mean(), color='red', linestyle='--', linewidth=2,
-                   label=f'Mean: {df_areas["Area"].mean():.1f} mm²')
-        ax3.fill_between(df_areas['Height_mm'], 
-                         df_areas['Area'].mean() - df_areas['Area'].std(),
-                         df_areas['Area'].mean() + df_areas['Area'].std(),
+        ax3 = fig.add_subplot(3, 2, 3)
+        ax3.plot(heights, areas, 'g-', linewidth=1.5, alpha=0.8)
+        ax3.axhline(area_mean, color='red', linestyle='--', linewidth=2,
+                   label=f'Mean: {area_mean:.1f} mm²')
+        ax3.fill_between(heights, area_mean - area_std, area_mean + area_std,
                          alpha=0.2, color='red', label='±1σ')
         ax3.set_xlabel('Height (mm)', fontsize=11, fontweight='bold')
         ax3.set_ylabel('Cross-section Area (mm²)', fontsize=11, fontweight='bold')
@@ -1098,23 +1163,13 @@ def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, s
         ax3.grid(True, alpha=0.3)
         
         # Plot 4: Volume error analysis
-        ax4 = plt.subplot(3, 2, 4)
-        calculated_volumes = []
-        measured_volumes = []
-        heights = []
+        ax4 = fig.add_subplot(3, 2, 4)
         
-        for i in range(len(df_areas)):
-            h = df_areas.iloc[i]['Height_mm']
-            v_measured = df_areas.iloc[i]['Volume_mm3']
-            # Find closest point in smooth profile
-            idx = np.argmin(np.abs(z_profile - h))
-            v_calc = calculate_profile_volume(z_profile[:idx+1], r_profile[:idx+1])[-1]
-            
-            heights.append(h)
-            measured_volumes.append(v_measured)
-            calculated_volumes.append(v_calc)
+        # Cumulative profile volume at the closest smooth-profile point to each measurement
+        profile_volumes = calculate_profile_volume(z_profile, r_profile)
+        calculated_volumes = profile_volumes[nearest_profile_index(z_profile, heights)]
         
-        errors = [(c - m) / m * 100 for c, m in zip(calculated_volumes, measured_volumes)]
+        errors = (calculated_volumes - measured_volumes) / measured_volumes * 100
         ax4.plot(heights, errors, 'purple', linewidth=2)
         ax4.axhline(0, color='black', linestyle='--', linewidth=1)
         ax4.fill_between(heights, -1, 1, alpha=0.2, color='green', label='±1% tolerance')
@@ -1125,7 +1180,7 @@ def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, s
         ax4.grid(True, alpha=0.3)
         
         # Plot 5: 3D visualization (cross-section view)
-        ax5 = plt.subplot(3, 2, 5)
+        ax5 = fig.add_subplot(3, 2, 5)
         # Create filled profile view
         ax5.fill_betweenx(z_profile, -r_profile, r_profile, alpha=0.3, color='skyblue', label='Container')
         ax5.plot(r_profile, z_profile, 'b-', linewidth=2, label='Right Profile')
@@ -1139,9 +1194,10 @@ def generate_comprehensive_plots(df, df_areas, segments, z_profile, r_profile, s
         ax5.axis('equal')
         
         # Plot 6: Summary statistics
-        ax6 = plt.subplot(3, 2, 6)
+        ax6 = fig.add_subplot(3, 2, 6)
         ax6.axis('off')
         
+        shapes = [s[2] for s in segments]
         stats_text = f"""
 ANALYSIS SUMMARY
 
@@ -1153,8 +1209,8 @@ Data Quality:
 
 Geometric Analysis:
 • Segments Detected: {len(segments)}
-• Cylinder Segments: {sum(1 for s in segments if s[2] == 'cylinder')}
-• Frustum Segments: {sum(1 for s in segments if s[2] == 'frustum')}
+• Cylinder Segments: {shapes.count('cylinder')}
+• Frustum Segments: {shapes.count('frustum')}
 
 Profile Quality:
 • Profile Points: {len(z_profile)}
@@ -1163,24 +1219,23 @@ Profile Quality:
 • Volume Accuracy: {100 - abs(np.mean(errors)):.2f}%
 
 Cross-Section Stats:
-• Mean Area: {df_areas['Area'].mean():.1f} mm²
-• Area Std Dev: {df_areas['Area'].std():.1f} mm²
-• Coefficient of Variation: {(df_areas['Area'].std() / df_areas['Area'].mean() * 100):.1f}%
+• Mean Area: {area_mean:.1f} mm²
+• Area Std Dev: {area_std:.1f} mm²
+• Coefficient of Variation: {(area_std / area_mean * 100):.1f}%
         """
         
         ax6.text(0.1, 0.95, stats_text, transform=ax6.transAxes,
                 fontsize=9, verticalalignment='top', fontfamily='monospace',
                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
         
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='white')
+        fig.tight_layout()
+        fig.savefig(save_path, dpi=DEFAULT_PARAMS['plot_dpi'], bbox_inches='tight', facecolor='white',
+                    format='png', pil_kwargs={'compress_level': 1})
         return save_path
     
     except Exception as e:
-        logger.error(f"Comprehensive plot generation failed: {e}", exc_info=True)
+        logger.error("Comprehensive plot generation failed: %s", e, exc_info=True)
         return None
-    finally:
-        plt.close('all')
 
 def launch_enhanced_gui():
     """Launch enhanced GUI with comprehensive reporting."""
@@ -1257,7 +1312,7 @@ Total Outputs: {summary['outputs_count']}
             messagebox.showinfo("Analysis Complete!", result_msg)
             
         except Exception as e:
-            logger.error(f"Analysis failed: {e}", exc_info=True)
+            logger.error("Analysis failed: %s", e, exc_info=True)
             messagebox.showerror("Analysis Error", f"Failed to analyze file:\n{str(e)}")
     
     # GUI Layout
@@ -1300,7 +1355,7 @@ if __name__ == "__main__":
             # Create job tracker
             job = AnalysisJob(csv_file)
             
-            logger.info(f"Starting analysis of: {csv_file}")
+            logger.info("Starting analysis of: %s", csv_file)
             
             df = load_data_csv(csv_file, job=job, verbose=True)
             df_areas = compute_areas(df, job=job, verbose=True)
@@ -1323,14 +1378,14 @@ if __name__ == "__main__":
             job.finalize()
             summary = job.get_summary()
             
-            logger.info(f"✅ Analysis Complete!")
-            logger.info(f"   Duration: {summary['duration']:.2f} seconds")
-            logger.info(f"   Steps: {summary['steps_count']}")
-            logger.info(f"   STL: {stl_path if stl_path else 'N/A'}")
-            logger.info(f"   PDF: {pdf_path if pdf_path else 'N/A'}")
+            logger.info("✅ Analysis Complete!")
+            logger.info("   Duration: %.2f seconds", summary['duration'])
+            logger.info("   Steps: %s", summary['steps_count'])
+            logger.info("   STL: %s", stl_path if stl_path else 'N/A')
+            logger.info("   PDF: %s", pdf_path if pdf_path else 'N/A')
             
         except Exception as e:
-            logger.error(f"Analysis failed: {e}", exc_info=True)
+            logger.error("Analysis failed: %s", e, exc_info=True)
             sys.exit(1)
     else:
         # Launch GUI